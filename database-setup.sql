@@ -88,3 +88,25 @@ CREATE INDEX IF NOT EXISTS idx_ingestion_logs_document ON ingestion_logs(documen
 -- Create vector similarity search indexes (these may take a moment if tables have data)
 CREATE INDEX IF NOT EXISTS idx_text_chunks_embedding ON text_chunks USING ivfflat (embedding vector_cosine_ops) WITH (lists = 100);
 CREATE INDEX IF NOT EXISTS idx_table_rows_embedding ON table_rows USING ivfflat (embedding vector_cosine_ops) WITH (lists = 100);
+
+-- Count rows per table server-side, so validation does not fetch the rows themselves
+CREATE OR REPLACE FUNCTION table_row_counts(table_ids TEXT[])
+RETURNS TABLE (table_id TEXT, row_count BIGINT)
+LANGUAGE sql STABLE
+AS $$
+  SELECT tr.table_id, COUNT(*) AS row_count
+  FROM table_rows tr
+  WHERE tr.table_id = ANY(table_ids)
+  GROUP BY tr.table_id;
+$$;
+
+-- Remove everything extracted from a document in one transaction (used by re-ingestion)
+CREATE OR REPLACE FUNCTION clear_document(doc_id INTEGER)
+RETURNS VOID
+LANGUAGE sql
+AS $$
+  DELETE FROM table_rows WHERE table_id IN (SELECT table_id FROM tables WHERE document_id = doc_id);
+  DELETE FROM tables WHERE document_id = doc_id;
+  DELETE FROM text_chunks WHERE document_id = doc_id;
+  DELETE FROM ingestion_logs WHERE document_id = doc_id;
+$$;
@@ -17,7 +17,7 @@ export interface PageText {
 }
 
 /**
- * Extract text from PDF file using pdfplumber (via Python)
+ * Extract text from PDF file using PyMuPDF (via Python)
  */
 export async function extractTextFromPDF(pdfPath: string): Promise<{
   text: string;
@@ -26,14 +26,14 @@ export async function extractTextFromPDF(pdfPath: string): Promise<{
 }> {
   const scriptPath = path.join(process.cwd(), "scripts", "extract_text.py");
 
+  // The full text is rebuilt from the pages below rather than sent twice
   const results = await PythonShell.run(scriptPath, {
-    args: [pdfPath],
+    args: [pdfPath, "--no-full-text"],
     mode: "json",
     pythonPath: path.join(process.cwd(), "venv", "bin", "python3"),
   });
 
   const data = results[0] as {
-    text: string;
     page_count: number;
     pages: Array<{ page: number; text: string }>;
   };
@@ -54,7 +54,7 @@ export async function extractTextFromPDF(pdfPath: string): Promise<{
   }
 
   return {
-    text: data.text,
+    text: data.pages.map((page) => page.text).join("\n\n"),
     pageCount: data.page_count,
     pages,
   };
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Document helpers for the maintenance scripts
+Reads the documents table page by page and checks their files exist
+"""
+
+import os
+from functools import lru_cache
+from typing import Any, Dict, Iterator
+
+# Documents fetched per request; PostgREST caps a response at 1000 rows by default
+DOCUMENTS_PAGE_SIZE = 1000
+
+
+def iter_documents(client, columns: str, page_size: int = DOCUMENTS_PAGE_SIZE) -> Iterator[Dict[str, Any]]:
+    """
+    Yield every document, fetched one page of rows at a time
+
+    A single select is capped by the API's row limit (1000 by default), so
+    documents are read in id order with range() until a short page comes back.
+
+    Args:
+        client: Supabase client
+        columns: Comma-separated document columns to select
+        page_size: Rows per request (at most the API row limit)
+    """
+    start = 0
+
+    while True:
+        batch = (client.table('documents').select(columns).order('id')
+                 .range(start, start + page_size - 1).execute().data)
+        yield from batch
+
+        if len(batch) < page_size:
+            break
+        start += page_size
+
+
+@lru_cache(maxsize=None)
+def _dir_entries(directory: str) -> frozenset:
+    """Names in a directory, listed once per run (empty if it does not exist)"""
+    try:
+        with os.scandir(directory) as entries:
+            return frozenset(entry.name for entry in entries)
+    except OSError:
+        return frozenset()
+
+
+def pdf_exists(file_path: str) -> bool:
+    """
+    Check a document's file exists with one directory listing per folder
+
+    Documents usually share a folder, so listing it once replaces a stat
+    call per document.
+    """
+    directory, name = os.path.split(file_path)
+    return name in _dir_entries(directory or '.')
@@ -0,0 +1,23 @@
+#!/usr/bin/env python3
+"""
+Environment loading for the maintenance scripts
+Reads KEY=value pairs from the project's .env.local into os.environ
+"""
+
+import os
+import re
+from pathlib import Path
+
+ENV_PATH = Path(__file__).parent.parent / '.env.local'
+
+# KEY=value on one line; blank lines and '#' comments never match
+_ENV_RE = re.compile(r'^[ \t]*([^#\s=][^=\n]*?)[ \t]*=(.*?)[ \t\r]*$', re.MULTILINE)
+
+
+def load_env(env_path: Path = ENV_PATH):
+    """Load environment variables from .env.local"""
+    if env_path.exists():
+        os.environ.update(
+            (key, value.strip('"').strip("'"))
+            for key, value in _ENV_RE.findall(env_path.read_text())
+        )
@@ -5,134 +5,198 @@ Supports lattice (primary) and stream (fallback) methods
 """
 
 import sys
+import re
 import json
+import heapq
+import numpy as np
 import pdfplumber
 import camelot
-from typing import List, Dict, Any, Optional
+from functools import lru_cache, partial
+from itertools import chain
+from operator import itemgetter
+from typing import Callable, List, Dict, Any, Optional
+from json_output import write_result
 
-def extract_context_lines(pdf_path: str, page_num: int, bbox: tuple, lines_count: int = 3) -> Dict[str, List[str]]:
+# Camelot flavors in order of preference, with their read_pdf options
+CAMELOT_FLAVORS = [
+    ('lattice', {'line_scale': 40}),
+    ('stream', {'edge_tol': 50, 'row_tol': 10}),
+]
+
+_DIGIT_RE = re.compile(r'\d')
+# Matched against lowercased header cells
+_PERIOD_RE = re.compile(r'quarter|year|month|fy|ended|202')
+
+
+def compile_keyword_groups(patterns: List[tuple]) -> re.Pattern:
+    """
+    Compile (label, keywords) groups into one regex, with group g<i> matching the i-th label
+
+    The alternation sits in a zero-width lookahead so every text position is
+    tried and an earlier group wins when several keywords start at the same place.
     """
-    Extract context lines above and below a table using pdfplumber text coordinates
+    groups = (f"(?P<g{i}>{'|'.join(map(re.escape, keywords))})"
+              for i, (_, keywords) in enumerate(patterns))
+    return re.compile(f"(?=(?:{'|'.join(groups)}))")
+
+
+def match_first_label(regex: re.Pattern, patterns: List[tuple], text: str) -> Optional[str]:
+    """
+    Return the label of the earliest-listed group with a keyword anywhere in text
+    """
+    best = None
+    for match in regex.finditer(text):
+        group = int(match.lastgroup[1:])
+        if best is None or group < best:
+            best = group
+            if best == 0:
+                break
+
+    return patterns[best][0] if best is not None else None
+
+
+_TABLE_PATTERNS = [
+    ('RATIOS', ['ratio', 'coverage', 'debt service', 'icr']),
+    ('NDCF', ['ndcf', 'net distributable cash flow']),
+    ('DISTRIBUTION', ['distribution', 'per unit', 'dpu']),
+    ('P&L', ['profit', 'loss', 'income', 'revenue', 'expenses']),
+    ('BALANCE_SHEET', ['assets', 'liabilities', 'equity', 'balance sheet']),
+]
+_TABLE_RE = compile_keyword_groups(_TABLE_PATTERNS)
+
+# Matched against lowercased text
+_UNIT_PATTERNS = [
+    ('₹ millions', ['₹ million', 'inr million', 'rs. million']),
+    ('₹ lakhs', ['₹ lakh', 'inr lakh', 'rs. lakh']),
+    ('₹ crores', ['₹ crore', 'inr crore', 'rs. crore']),
+    ('%', ['%', 'percent', 'percentage']),
+    ('times', ['times', ' x ']),
+    ('INR', ['₹', 'inr', 'rs.']),
+]
+_UNIT_RE = compile_keyword_groups(_UNIT_PATTERNS)
+
+def line_bounds(tops: np.ndarray, tolerance: float) -> List[int]:
+    """
+    Split sorted word tops into lines, returning the start index of each line plus len(tops)
+
+    A line holds every word at most `tolerance` below its first word, so a
+    binary search finds where each line ends and Python only loops once per
+    line, not per word.
+    """
+    bounds = [0]
+    while bounds[-1] < len(tops):
+        bounds.append(int(np.searchsorted(tops, tops[bounds[-1]] + tolerance, side='right')))
+
+    return bounds
+
+
+def get_page_lines(pdf, page_num: int) -> List[Dict[str, Any]]:
+    """
+    Get all text lines from a PDF page with coordinates
 
     Args:
-        pdf_path: Path to PDF file
+        pdf: Open pdfplumber PDF
         page_num: Page number (1-indexed)
-        bbox: Bounding box (x0, y0, x1, y1)
-        lines_count: Number of lines to extract above/below
 
     Returns:
-        Dictionary with 'above' and 'below' lists of text lines
+        List of text lines with y-coordinates
     """
-    context = {'above': [], 'below': []}
+    lines = []
 
     try:
-        with pdfplumber.open(pdf_path) as pdf:
-            if page_num > len(pdf.pages):
-                return context
-
+        if page_num <= len(pdf.pages):
             page = pdf.pages[page_num - 1]
 
             # Get all text with coordinates
             words = page.extract_words(x_tolerance=3, y_tolerance=3)
 
+            # Only the words are needed; release the page's cached layout objects
+            # so memory does not grow with every page visited on long documents
+            page.close()
+
+            # Sort words by (top, x0) on coordinate arrays
+            tops = np.fromiter((w['top'] for w in words), dtype=np.float64, count=len(words))
+            x0s = np.fromiter((w['x0'] for w in words), dtype=np.float64, count=len(words))
+            order = np.lexsort((x0s, tops))
+            tops = tops[order]
+            words = [words[i] for i in order]
+
             # Group words into lines by y-coordinate
-            lines = []
-            current_line = []
-            current_y = None
-            tolerance = 5  # pixels
-
-            for word in sorted(words, key=lambda w: (w['top'], w['x0'])):
-                if current_y is None or abs(word['top'] - current_y) > tolerance:
-                    if current_line:
-                        lines.append({
-                            'text': ' '.join([w['text'] for w in current_line]),
-                            'y': current_y
-                        })
-                    current_line = [word]
-                    current_y = word['top']
-                else:
-                    current_line.append(word)
-
-            # Add last line
-            if current_line:
+            bounds = line_bounds(tops, tolerance=5)  # pixels
+
+            for start, end in zip(bounds[:-1], bounds[1:]):
                 lines.append({
-                    'text': ' '.join([w['text'] for w in current_line]),
-                    'y': current_y
+                    'text': ' '.join([w['text'] for w in words[start:end]]),
+                    'y': words[start]['top']
                 })
 
-            # Find lines above table (y < bbox[1])
-            table_top_y = bbox[1]
-            above_lines = [l for l in lines if l['y'] < table_top_y]
-            above_lines.sort(key=lambda l: l['y'], reverse=True)
-            context['above'] = [l['text'] for l in above_lines[:lines_count]]
-            context['above'].reverse()  # Correct order
-
-            # Find lines below table (y > bbox[3])
-            table_bottom_y = bbox[3]
-            below_lines = [l for l in lines if l['y'] > table_bottom_y]
-            below_lines.sort(key=lambda l: l['y'])
-            context['below'] = [l['text'] for l in below_lines[:lines_count]]
-
     except Exception as e:
         print(f"Error extracting context: {e}", file=sys.stderr)
 
-    return context
+    return lines
 
 
-def classify_table(table_data: List[List[str]], context_above: List[str]) -> str:
+def extract_context_lines(lines: List[Dict[str, Any]], bbox: tuple, lines_count: int = 3) -> Dict[str, List[str]]:
     """
-    Classify table type based on content and context
+    Extract context lines above and below a table from the page's text lines
+
+    Args:
+        lines: Text lines of the table's page (see get_page_lines)
+        bbox: Bounding box (x0, y0, x1, y1)
+        lines_count: Number of lines to extract above/below
+
+    Returns:
+        Dictionary with 'above' and 'below' lists of text lines
     """
-    all_text = ' '.join(context_above + [' '.join(row) for row in table_data]).lower()
+    context = {'above': [], 'below': []}
 
-    patterns = [
-        ('RATIOS', ['ratio', 'coverage', 'debt service', 'icr']),
-        ('NDCF', ['ndcf', 'net distributable cash flow']),
-        ('DISTRIBUTION', ['distribution', 'per unit', 'dpu']),
-        ('P&L', ['profit', 'loss', 'income', 'revenue', 'expenses']),
-        ('BALANCE_SHEET', ['assets', 'liabilities', 'equity', 'balance sheet']),
-    ]
+    # Find the nearest lines above table (y < bbox[1])
+    table_top_y = bbox[1]
+    above_lines = heapq.nlargest(lines_count, (l for l in lines if l['y'] < table_top_y),
+                                 key=itemgetter('y'))
+    context['above'] = [l['text'] for l in reversed(above_lines)]  # Correct order
 
-    for name, keywords in patterns:
-        if any(kw in all_text for kw in keywords):
-            return name
+    # Find the nearest lines below table (y > bbox[3])
+    table_bottom_y = bbox[3]
+    below_lines = heapq.nsmallest(lines_count, (l for l in lines if l['y'] > table_bottom_y),
+                                  key=itemgetter('y'))
+    context['below'] = [l['text'] for l in below_lines]
 
-    return 'UNKNOWN'
+    return context
 
 
-def detect_unit(table_data: List[List[str]], context_above: List[str]) -> Optional[str]:
+def table_text(table_data: List[List[str]], context_above: List[str]) -> str:
     """
-    Detect unit from table content and context
+    Lowercased text of a table and its context, shared by the classifiers
     """
-    all_text = ' '.join(context_above + [' '.join(row) for row in table_data])
+    return ' '.join(chain(context_above, chain.from_iterable(table_data))).lower()
 
-    unit_patterns = [
-        ('₹ millions', ['₹ million', 'INR million', 'Rs. million']),
-        ('₹ lakhs', ['₹ lakh', 'INR lakh', 'Rs. lakh']),
-        ('₹ crores', ['₹ crore', 'INR crore', 'Rs. crore']),
-        ('%', ['%', 'percent', 'percentage']),
-        ('times', ['times', ' x ']),
-        ('INR', ['₹', 'INR', 'Rs.']),
-    ]
 
-    for unit, patterns in unit_patterns:
-        if any(p.lower() in all_text.lower() for p in patterns):
-            return unit
+def classify_table(all_text: str) -> str:
+    """
+    Classify table type based on content and context
 
-    return None
+    Args:
+        all_text: Lowercased table and context text (see table_text)
+    """
+    return match_first_label(_TABLE_RE, _TABLE_PATTERNS, all_text) or 'UNKNOWN'
 
 
-def extract_periods(header_row: List[str]) -> List[str]:
+def detect_unit(all_text: str) -> Optional[str]:
     """
-    Extract period labels from table header
+    Detect unit from table content and context
+
+    Args:
+        all_text: Lowercased table and context text (see table_text)
     """
-    periods = []
+    return match_first_label(_UNIT_RE, _UNIT_PATTERNS, all_text)
 
-    for cell in header_row:
-        if any(keyword in cell.lower() for keyword in ['quarter', 'year', 'month', 'fy', 'ended', '202']):
-            periods.append(cell)
 
-    return periods
+def extract_periods(header_row: List[str]) -> List[str]:
+    """
+    Extract period labels from table header
+    """
+    return [cell for cell in header_row if _PERIOD_RE.search(cell.lower())]
 
 
 def calculate_confidence(table_data: List[List[str]]) -> float:
@@ -151,18 +215,17 @@ def calculate_confidence(table_data: List[List[str]]) -> float:
         score += 0.1
 
     # Consistent column count
-    col_counts = [len(row) for row in table_data]
-    avg_cols = sum(col_counts) / len(col_counts)
-    variance = sum((c - avg_cols) ** 2 for c in col_counts) / len(col_counts)
+    col_counts = np.fromiter(map(len, table_data), dtype=np.int64, count=len(table_data))
+    variance = col_counts.var()
 
     if variance < 1:
         score += 0.2
     elif variance < 2:
         score += 0.1
 
-    # Numeric data presence
-    numeric_cells = sum(1 for row in table_data for cell in row if any(c.isdigit() for c in cell))
-    total_cells = sum(len(row) for row in table_data)
+    # Numeric data presence (one flat pass over all cells)
+    numeric_cells = sum(map(bool, map(_DIGIT_RE.search, chain.from_iterable(table_data))))
+    total_cells = int(col_counts.sum())
     numeric_ratio = numeric_cells / total_cells if total_cells > 0 else 0
 
     if numeric_ratio > 0.3:
@@ -171,6 +234,79 @@ def calculate_confidence(table_data: List[List[str]]) -> float:
     return min(score, 1.0)
 
 
+def process_camelot_tables(tables, page_lines: Callable[[int], List[Dict[str, Any]]],
+                           context_lines_count: int, method: str,
+                           start_index: int = 0) -> List[Dict[str, Any]]:
+    """
+    Convert Camelot tables into result dictionaries with context and metadata
+
+    Args:
+        tables: Camelot TableList from one read_pdf call
+        page_lines: Returns the text lines of a page number (see get_page_lines)
+        context_lines_count: Number of context lines to extract above/below each table
+        method: Camelot flavor that produced the tables ('lattice' or 'stream')
+        start_index: Index of the first table, continuing the numbering across calls
+
+    Returns:
+        List of table dictionaries (tables with fewer than 2 rows are skipped)
+    """
+    processed = []
+
+    # Nested or repeated tables often share vertical edges, and so share context
+    context_cache: Dict[tuple, Dict[str, List[str]]] = {}
+
+    for idx, table in enumerate(tables, start=start_index):
+        page_num = table.page
+
+        # Get bounding box
+        bbox = (
+            table._bbox[0],
+            table._bbox[1],
+            table._bbox[2],
+            table._bbox[3]
+        )
+
+        # Extract context lines
+        context_key = (page_num, bbox[1], bbox[3])
+        context = context_cache.get(context_key)
+        if context is None:
+            context = extract_context_lines(page_lines(page_num), bbox, context_lines_count)
+            context_cache[context_key] = context
+
+        # Convert table to list of lists
+        table_data = table.df.values.tolist()
+
+        # Skip empty tables
+        if len(table_data) < 2:
+            continue
+
+        # Classify and extract metadata
+        all_text = table_text(table_data, context['above'])
+        table_name = classify_table(all_text)
+        unit = detect_unit(all_text)
+        periods = extract_periods(table_data[0] if table_data else [])
+        confidence = calculate_confidence(table_data)
+
+        # Add accuracy score from Camelot
+        if hasattr(table, 'accuracy'):
+            confidence = (confidence + table.accuracy / 100) / 2
+
+        processed.append({
+            'page': page_num,
+            'table_index_on_page': idx,
+            'table_name': table_name,
+            'unit': unit,
+            'periods': periods,
+            'raw_table_grid': table_data,
+            'context_above_lines': context['above'],
+            'context_below_lines': context['below'],
+            'confidence': confidence,
+            'extraction_method': method
+        })
+
+    return processed
+
+
 def extract_tables_from_pdf(pdf_path: str, context_lines_count: int = 3) -> Dict[str, Any]:
     """
     Extract all tables from PDF using Camelot (lattice + stream fallback)
@@ -190,125 +326,43 @@ def extract_tables_from_pdf(pdf_path: str, context_lines_count: int = 3) -> Dict
     }
 
     try:
-        # Get page count
+        # Open the PDF once; a page's text lines are grouped once and shared
+        # by every table on it. Pages are visited in order, so a small LRU
+        # keeps memory bounded on long documents.
         with pdfplumber.open(pdf_path) as pdf:
             result['page_count'] = len(pdf.pages)
-
-        # Try lattice method first (primary)
-        try:
-            lattice_tables = camelot.read_pdf(
-                pdf_path,
-                pages='all',
-                flavor='lattice',
-                line_scale=40,
-                strip_text='\n'
-            )
-
-            for idx, table in enumerate(lattice_tables):
-                page_num = table.page
-
-                # Get bounding box
-                bbox = (
-                    table._bbox[0],
-                    table._bbox[1],
-                    table._bbox[2],
-                    table._bbox[3]
-                )
-
-                # Extract context lines
-                context = extract_context_lines(pdf_path, page_num, bbox, context_lines_count)
-
-                # Convert table to list of lists
-                table_data = table.df.values.tolist()
-
-                # Skip empty tables
-                if len(table_data) < 2:
-                    continue
-
-                # Classify and extract metadata
-                table_name = classify_table(table_data, context['above'])
-                unit = detect_unit(table_data, context['above'])
-                periods = extract_periods(table_data[0] if table_data else [])
-                confidence = calculate_confidence(table_data)
-
-                # Add accuracy score from Camelot
-                if hasattr(table, 'accuracy'):
-                    confidence = (confidence + table.accuracy / 100) / 2
-
-                result['tables'].append({
-                    'page': page_num,
-                    'table_index_on_page': idx,
-                    'table_name': table_name,
-                    'unit': unit,
-                    'periods': periods,
-                    'raw_table_grid': table_data,
-                    'context_above_lines': context['above'],
-                    'context_below_lines': context['below'],
-                    'confidence': confidence,
-                    'extraction_method': 'lattice'
-                })
-
-        except Exception as e:
-            result['errors'].append(f"Lattice extraction error: {str(e)}")
-
-        # Fallback to stream method if lattice found no tables or failed
-        if len(result['tables']) == 0:
-            try:
-                stream_tables = camelot.read_pdf(
-                    pdf_path,
-                    pages='all',
-                    flavor='stream',
-                    edge_tol=50,
-                    row_tol=10,
-                    strip_text='\n'
-                )
-
-                for idx, table in enumerate(stream_tables):
-                    page_num = table.page
-
-                    # Get bounding box
-                    bbox = (
-                        table._bbox[0],
-                        table._bbox[1],
-                        table._bbox[2],
-                        table._bbox[3]
-                    )
-
-                    # Extract context lines
-                    context = extract_context_lines(pdf_path, page_num, bbox, context_lines_count)
-
-                    # Convert table to list of lists
-                    table_data = table.df.values.tolist()
-
-                    # Skip empty tables
-                    if len(table_data) < 2:
-                        continue
-
-                    # Classify and extract metadata
-                    table_name = classify_table(table_data, context['above'])
-                    unit = detect_unit(table_data, context['above'])
-                    periods = extract_periods(table_data[0] if table_data else [])
-                    confidence = calculate_confidence(table_data)
-
-                    # Add accuracy score from Camelot
-                    if hasattr(table, 'accuracy'):
-                        confidence = (confidence + table.accuracy / 100) / 2
-
-                    result['tables'].append({
-                        'page': page_num,
-                        'table_index_on_page': idx,
-                        'table_name': table_name,
-                        'unit': unit,
-                        'periods': periods,
-                        'raw_table_grid': table_data,
-                        'context_above_lines': context['above'],
-                        'context_below_lines': context['below'],
-                        'confidence': confidence,
-                        'extraction_method': 'stream'
-                    })
-
-            except Exception as e:
-                result['errors'].append(f"Stream extraction error: {str(e)}")
+            page_lines = lru_cache(maxsize=32)(partial(get_page_lines, pdf))
+
+            # Try lattice method first (primary), then fall back to stream if
+            # lattice found no tables. Camelot is run one page at a time so
+            # only the current page's tables are held in memory; a page that
+            # fails is recorded and skipped without stopping the others.
+            for flavor, flavor_options in CAMELOT_FLAVORS:
+                if result['tables']:
+                    break
+
+                table_count = 0
+
+                for page in range(1, result['page_count'] + 1):
+                    try:
+                        tables = camelot.read_pdf(
+                            pdf_path,
+                            pages=str(page),
+                            flavor=flavor,
+                            suppress_stdout=True,
+                            strip_text='\n',
+                            **flavor_options
+                        )
+
+                        result['tables'].extend(process_camelot_tables(
+                            tables, page_lines, context_lines_count, flavor, table_count
+                        ))
+                        table_count += len(tables)
+
+                    except Exception as e:
+                        result['errors'].append(
+                            f"{flavor.capitalize()} extraction error on page {page}: {str(e)}"
+                        )
 
     except Exception as e:
         result['success'] = False
@@ -326,4 +380,4 @@ if __name__ == '__main__':
     context_lines = int(sys.argv[2]) if len(sys.argv) > 2 else 3
 
     result = extract_tables_from_pdf(pdf_path, context_lines)
-    print(json.dumps(result, ensure_ascii=False))
+    write_result(result)
@@ -8,6 +8,7 @@ import sys
 import json
 from extract_tables import extract_tables_from_pdf
 from ocr_tables import extract_tables_with_ocr
+from json_output import write_result
 
 
 def extract_tables_hybrid(pdf_path: str, context_lines_count: int = 20,
@@ -94,4 +95,4 @@ if __name__ == '__main__':
     document_id = int(sys.argv[3]) if len(sys.argv) > 3 else 0
 
     result = extract_tables_hybrid(pdf_path, context_lines, 1, document_id)
-    print(json.dumps(result, ensure_ascii=False))
+    write_result(result)
@@ -1,53 +1,64 @@
 #!/usr/bin/env python3
 """
-Extract text from PDF using pdfplumber
+Extract text from PDF using PyMuPDF (pdfplumber with --pdfplumber)
 Returns JSON with full text, page count, and per-page text
 """
 
 import sys
 import json
+import pymupdf
 import pdfplumber
-from typing import Dict, List, Any
+from typing import Dict, Iterator, List, Any
 
 
-def extract_text_from_pdf(pdf_path: str) -> Dict[str, Any]:
+def iter_page_texts(pdf_path: str, use_pdfplumber: bool = False) -> Iterator[str]:
     """
-    Extract text from PDF file using pdfplumber
+    Yield the text of each page in order
+
+    PyMuPDF extracts text in C and is much faster; pdfplumber goes through
+    pdfminer and is kept for layout-sensitive jobs.
+    """
+    if use_pdfplumber:
+        with pdfplumber.open(pdf_path) as pdf:
+            for page in pdf.pages:
+                yield page.extract_text() or ""
+    else:
+        with pymupdf.open(pdf_path) as doc:
+            for page in doc:
+                yield page.get_text()
+
+
+def extract_text_from_pdf(pdf_path: str, use_pdfplumber: bool = False,
+                          include_full_text: bool = True) -> Dict[str, Any]:
+    """
+    Extract text from PDF file using PyMuPDF
 
     Args:
         pdf_path: Path to PDF file
+        use_pdfplumber: Extract with pdfplumber instead of PyMuPDF
+        include_full_text: Also return all pages concatenated as 'text'
 
     Returns:
         Dictionary with:
-        - text: Full PDF text (all pages concatenated)
+        - text: Full PDF text (all pages concatenated), if include_full_text
         - page_count: Number of pages
         - pages: List of {page: int, text: str}
     """
-    pages_data = []
-    full_text_parts = []
-
-    with pdfplumber.open(pdf_path) as pdf:
-        page_count = len(pdf.pages)
-
-        for i, page in enumerate(pdf.pages, start=1):
-            # Extract text from page
-            page_text = page.extract_text() or ""
+    pages_data = [
+        {"page": i, "text": page_text}
+        for i, page_text in enumerate(iter_page_texts(pdf_path, use_pdfplumber), start=1)
+    ]
 
-            pages_data.append({
-                "page": i,
-                "text": page_text
-            })
+    result = {}
 
-            full_text_parts.append(page_text)
+    if include_full_text:
+        # Combine all pages with page breaks
+        result["text"] = "\n\n".join(p["text"] for p in pages_data)
 
-    # Combine all pages with page breaks
-    full_text = "\n\n".join(full_text_parts)
+    result["page_count"] = len(pages_data)
+    result["pages"] = pages_data
 
-    return {
-        "text": full_text,
-        "page_count": page_count,
-        "pages": pages_data
-    }
+    return result
 
 
 if __name__ == "__main__":
@@ -56,9 +67,11 @@ if __name__ == "__main__":
         sys.exit(1)
 
     pdf_path = sys.argv[1]
+    use_pdfplumber = "--pdfplumber" in sys.argv[2:]
+    include_full_text = "--no-full-text" not in sys.argv[2:]
 
     try:
-        result = extract_text_from_pdf(pdf_path)
+        result = extract_text_from_pdf(pdf_path, use_pdfplumber, include_full_text)
         print(json.dumps(result))
     except Exception as e:
         print(json.dumps({"error": str(e)}))
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Streaming JSON output for the table extraction scripts
+Writes a result dict to stdout one table at a time as a single JSON line
+"""
+
+import sys
+import orjson
+from typing import Any, BinaryIO, Dict, Optional
+
+
+def write_result(result: Dict[str, Any], stream: Optional[BinaryIO] = None,
+                 stream_key: str = 'tables') -> None:
+    """
+    Serialise result as one line of JSON without building the whole document in memory
+
+    Every value except result[stream_key] is dumped in one piece; the list
+    under stream_key is written element by element, so the output buffer
+    never holds more than a single table. Key order and the encoded bytes
+    match orjson.dumps(result).
+
+    Args:
+        result: Extraction result (JSON-serialisable, NumPy scalars allowed)
+        stream: Binary stream to write to (defaults to stdout)
+        stream_key: Key whose list value is written one element at a time
+    """
+    out = stream if stream is not None else sys.stdout.buffer
+    option = orjson.OPT_SERIALIZE_NUMPY
+
+    out.write(b'{')
+    for i, (key, value) in enumerate(result.items()):
+        if i:
+            out.write(b',')
+        out.write(orjson.dumps(key) + b':')
+
+        if key == stream_key and isinstance(value, list):
+            out.write(b'[')
+            for j, item in enumerate(value):
+                if j:
+                    out.write(b',')
+                out.write(orjson.dumps(item, option=option))
+            out.write(b']')
+        else:
+            out.write(orjson.dumps(value, option=option))
+
+    out.write(b'}\n')
+    out.flush()
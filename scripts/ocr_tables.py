@@ -5,66 +5,40 @@ Uses Tesseract OCR to extract tables from PDF pages
 """
 
 import sys
+import os
 import json
+import heapq
+import threading
+import numpy as np
 import pdfplumber
+import pymupdf
 from PIL import Image
 import pytesseract
-import pdf2image
-from typing import List, Dict, Any, Optional
-import re
+from concurrent.futures import ThreadPoolExecutor
+from operator import itemgetter
+from typing import List, Dict, Any, Optional, Tuple
+from extract_tables import compile_keyword_groups, get_page_lines, match_first_label
+from json_output import write_result
 
+# Pages are OCR'd in parallel, one Tesseract process each; stop every process
+# from also spawning one OpenMP thread per core
+os.environ.setdefault('OMP_THREAD_LIMIT', '1')
 
-def get_page_text_lines(pdf_path: str, page_num: int) -> List[Dict[str, Any]]:
-    """
-    Extract all text lines from a PDF page with coordinates
+# MuPDF documents must not be used from several threads at once
+_render_lock = threading.Lock()
 
-    Args:
-        pdf_path: Path to PDF file
-        page_num: Page number (1-indexed)
+_DIGITS = frozenset('0123456789')
 
-    Returns:
-        List of text lines with y-coordinates
-    """
-    lines = []
+_OCR_TABLE_PATTERNS = [
+    ('RATIOS', ['ratio', 'coverage', 'debt service', 'icr']),
+    ('NDCF', ['ndcf', 'net distributable cash flow']),
+    ('DISTRIBUTION', ['distribution', 'per unit', 'dpu']),
+    ('P&L', ['profit', 'loss', 'income', 'revenue', 'expenses']),
+    ('BALANCE_SHEET', ['assets', 'liabilities', 'equity', 'balance sheet']),
+    ('FINANCIAL', ['financial', 'statement', 'quarter', 'year']),
+]
 
-    try:
-        with pdfplumber.open(pdf_path) as pdf:
-            if page_num > len(pdf.pages):
-                return lines
-
-            page = pdf.pages[page_num - 1]
-
-            # Get all text with coordinates
-            words = page.extract_words(x_tolerance=3, y_tolerance=3)
-
-            # Group words into lines by y-coordinate
-            current_line = []
-            current_y = None
-            tolerance = 5  # pixels
-
-            for word in sorted(words, key=lambda w: (w['top'], w['x0'])):
-                if current_y is None or abs(word['top'] - current_y) > tolerance:
-                    if current_line:
-                        lines.append({
-                            'text': ' '.join([w['text'] for w in current_line]),
-                            'y': current_y
-                        })
-                    current_line = [word]
-                    current_y = word['top']
-                else:
-                    current_line.append(word)
-
-            # Add last line
-            if current_line:
-                lines.append({
-                    'text': ' '.join([w['text'] for w in current_line]),
-                    'y': current_y
-                })
-
-    except Exception as e:
-        print(f"Error extracting text lines: {e}", file=sys.stderr)
-
-    return lines
+_OCR_TABLE_RE = compile_keyword_groups(_OCR_TABLE_PATTERNS)
 
 
 def get_context_lines(lines: List[Dict[str, Any]], target_y: float,
@@ -81,99 +55,216 @@ def get_context_lines(lines: List[Dict[str, Any]], target_y: float,
     Returns:
         List of context lines
     """
+    # Only the nearest lines_count lines are needed, so select them with a
+    # bounded heap instead of sorting every line on the page
     if direction == 'above':
-        context_lines = [l for l in lines if l['y'] < target_y]
-        context_lines.sort(key=lambda l: l['y'], reverse=True)
-        result = [l['text'] for l in context_lines[:lines_count]]
-        result.reverse()  # Correct order
-        return result
+        context_lines = heapq.nlargest(lines_count, (l for l in lines if l['y'] < target_y),
+                                       key=itemgetter('y'))
+        return [l['text'] for l in reversed(context_lines)]  # Correct order
     else:  # below
-        context_lines = [l for l in lines if l['y'] > target_y]
-        context_lines.sort(key=lambda l: l['y'])
-        return [l['text'] for l in context_lines[:lines_count]]
+        context_lines = heapq.nsmallest(lines_count, (l for l in lines if l['y'] > target_y),
+                                        key=itemgetter('y'))
+        return [l['text'] for l in context_lines]
+
+
+def render_page_image(doc, page_num: int, dpi: int, clip=None) -> Image.Image:
+    """
+    Render a page (or a clip of it, in PDF points) to a binarized grayscale image
+
+    Binarizing here with Otsu's threshold lets Tesseract skip its own
+    thresholding pass, and a one-channel image is a third of the RGB size.
+    """
+    # Render PDF page to image in-process (no pdftoppm subprocess or temp files)
+    with _render_lock:
+        pix = doc[page_num - 1].get_pixmap(dpi=dpi, colorspace=pymupdf.csGRAY, clip=clip)
+        gray = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.stride)[:, :pix.width]
+
+    # Otsu: pick the threshold maximising between-class variance of the histogram
+    hist = np.bincount(gray.ravel(), minlength=256).astype(np.float64)
+    weight = np.cumsum(hist)
+    mass = np.cumsum(hist * np.arange(256))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        between = (mass[-1] * weight - mass * weight[-1]) ** 2 / (weight * (weight[-1] - weight))
+    between[~np.isfinite(between)] = 0
+    threshold = int(between.argmax())
+
+    return Image.fromarray(np.where(gray > threshold, 255, 0).astype(np.uint8))
+
+
+def find_table_blocks(ocr_data: Dict[str, list], page_num: int,
+                      scale: float) -> Tuple[List[Dict[str, Any]], float]:
+    """
+    Pick the Tesseract blocks that look like tables
+
+    Args:
+        ocr_data: pytesseract.image_to_data output (Output.DICT)
+        page_num: Page number (1-indexed)
+        scale: PDF points per image pixel (72 / dpi)
+
+    Returns:
+        Table regions with bboxes in PDF points, and the mean OCR confidence
+        of the tokens in those regions
+    """
+    table_regions = []
+
+    # Tesseract output is columnar (one list per field); keep confident tokens
+    conf = np.trunc(np.asarray(ocr_data['conf'], dtype=np.float64))
+    kept = np.flatnonzero(conf > 30)  # Confidence threshold
+
+    if len(kept) == 0:
+        return table_regions, 0.0
+
+    # Detect table-like structures (blocks with multiple columns)
+    # Group tokens by block; the stable sort keeps reading order inside a block
+    idx = kept[np.argsort(np.asarray(ocr_data['block_num'])[kept], kind='stable')]
+    block_nums = np.asarray(ocr_data['block_num'])[idx]
+    starts = np.flatnonzero(np.r_[True, block_nums[1:] != block_nums[:-1]])
+    ends = np.r_[starts[1:], len(idx)]
+
+    texts = [ocr_data['text'][i].strip() for i in idx]
+    has_text = np.fromiter(map(bool, texts), dtype=bool, count=len(texts))
+    text_counts = np.add.reduceat(has_text, starts, dtype=np.int64)
+    conf_sums = np.add.reduceat(conf[idx], starts)
+
+    # A block's box is anchored at its first token and grows to cover every
+    # token with text
+    left = np.asarray(ocr_data['left'])[idx]
+    top = np.asarray(ocr_data['top'])[idx]
+    right = left + np.asarray(ocr_data['width'])[idx]
+    bottom = top + np.asarray(ocr_data['height'])[idx]
+    in_box = has_text.copy()
+    in_box[starts] = True
+    block_rights = np.maximum.reduceat(np.where(in_box, right, 0), starts)
+    block_bottoms = np.maximum.reduceat(np.where(in_box, bottom, 0), starts)
+
+    conf_total = 0.0
+    token_total = 0
+
+    # Filter blocks that look like tables (multiple rows/columns of data),
+    # in the order the blocks first appear on the page
+    for b in np.argsort(idx[starts], kind='stable'):
+        # Heuristic: Tables have numbers, multiple items, structured layout
+        has_multiple_items = text_counts[b] >= 6
+        if not has_multiple_items:
+            continue
+
+        # Combine all text from this block
+        block_text = ' | '.join([t for t in texts[starts[b]:ends[b]] if t])
+        has_numbers = not _DIGITS.isdisjoint(block_text)
+
+        if has_numbers:
+            conf_total += conf_sums[b]
+            token_total += ends[b] - starts[b]
+            table_regions.append({
+                'page': page_num,
+                'bbox': (
+                    float(left[starts[b]]) * scale,
+                    float(top[starts[b]]) * scale,
+                    float(block_rights[b]) * scale,
+                    float(block_bottoms[b]) * scale
+                ),
+                'ocr_text': block_text,
+                'confidence': 0.6,  # OCR-based extraction has medium confidence
+                'extraction_method': 'ocr'
+            })
+
+    return table_regions, (conf_total / token_total if token_total else 0.0)
+
+
+def may_hold_missed_table(ocr_data: Dict[str, list], min_confidence: float) -> bool:
+    """
+    Check whether a page with no table blocks may still hold a table
 
+    True when the page's words were read with low mean confidence, or when a
+    block with digits has enough words for a table once low-confidence words
+    are counted too. Blank pages, prose and short numeric blocks such as page
+    numbers give False.
 
-def detect_table_regions_with_ocr(pdf_path: str, page_num: int, dpi: int = 300) -> List[Dict[str, Any]]:
+    Args:
+        ocr_data: pytesseract.image_to_data output (Output.DICT)
+        min_confidence: Mean Tesseract confidence (0-100) below which the page is suspect
+    """
+    # Word tokens only; layout rows have confidence -1 and no text
+    conf = np.trunc(np.asarray(ocr_data['conf'], dtype=np.float64))
+    texts = [t.strip() for t in ocr_data['text']]
+    words = np.flatnonzero((conf >= 0) & np.fromiter(map(bool, texts), dtype=bool, count=len(texts)))
+
+    if len(words) == 0:
+        return False
+
+    if conf[words].mean() < min_confidence:
+        return True
+
+    block_nums = np.asarray(ocr_data['block_num'])[words]
+    for block in np.unique(block_nums):
+        block_words = words[block_nums == block]
+        if len(block_words) >= 6 and any(not _DIGITS.isdisjoint(texts[i]) for i in block_words):
+            return True
+
+    return False
+
+
+def detect_table_regions_with_ocr(doc, page_num: int, dpi: int = 150,
+                                  retry_dpi: int = 300,
+                                  min_confidence: float = 70) -> List[Dict[str, Any]]:
     """
     Use OCR to detect potential table regions on a page
 
+    The page is read at a low resolution first; only when the table blocks
+    found there are read with low confidence are those blocks rendered again
+    at retry_dpi and re-read, so high-resolution OCR covers the table area
+    rather than the whole page.
+
+    A page with no table blocks is read once more in full at retry_dpi only
+    when may_hold_missed_table finds signs of one; such pages cost both
+    passes, more than the single retry_dpi pass they would otherwise need.
+    Blank and prose pages stop after the low-resolution pass.
+
     Args:
-        pdf_path: Path to PDF file
+        doc: Open PyMuPDF document
         page_num: Page number (1-indexed)
-        dpi: Resolution for image conversion
+        dpi: Resolution for the first, whole-page pass
+        retry_dpi: Resolution for re-reading low-confidence table regions
+        min_confidence: Mean Tesseract confidence (0-100) needed to accept the first pass
 
     Returns:
-        List of detected table regions with OCR text
+        List of detected table regions with OCR text (bboxes in PDF points)
     """
     table_regions = []
 
     try:
-        # Convert PDF page to image
-        images = pdf2image.convert_from_path(
-            pdf_path,
-            first_page=page_num,
-            last_page=page_num,
-            dpi=dpi
-        )
-
-        if not images:
-            return table_regions
-
-        image = images[0]
+        image = render_page_image(doc, page_num, dpi)
 
         # Perform OCR with layout preservation
         ocr_data = pytesseract.image_to_data(image, output_type=pytesseract.Output.DICT)
+        table_regions, mean_conf = find_table_blocks(ocr_data, page_num, 72 / dpi)
+
+        if not table_regions:
+            if not may_hold_missed_table(ocr_data, min_confidence):
+                return table_regions
 
-        # Detect table-like structures (blocks with multiple columns)
-        # Group text by blocks
-        blocks = {}
-        for i in range(len(ocr_data['text'])):
-            if int(ocr_data['conf'][i]) > 30:  # Confidence threshold
-                block_num = ocr_data['block_num'][i]
-                if block_num not in blocks:
-                    blocks[block_num] = {
-                        'texts': [],
-                        'left': ocr_data['left'][i],
-                        'top': ocr_data['top'][i],
-                        'width': ocr_data['width'][i],
-                        'height': ocr_data['height'][i]
-                    }
-
-                text = ocr_data['text'][i].strip()
-                if text:
-                    blocks[block_num]['texts'].append(text)
-                    # Update bounding box
-                    right = ocr_data['left'][i] + ocr_data['width'][i]
-                    bottom = ocr_data['top'][i] + ocr_data['height'][i]
-                    blocks[block_num]['width'] = max(blocks[block_num]['width'],
-                                                     right - blocks[block_num]['left'])
-                    blocks[block_num]['height'] = max(blocks[block_num]['height'],
-                                                      bottom - blocks[block_num]['top'])
-
-        # Filter blocks that look like tables (multiple rows/columns of data)
-        for block_num, block_data in blocks.items():
-            texts = block_data['texts']
-
-            # Heuristic: Tables have numbers, multiple items, structured layout
-            has_numbers = any(re.search(r'\d', t) for t in texts)
-            has_multiple_items = len(texts) >= 6
-
-            if has_numbers and has_multiple_items:
-                # Combine all text from this block
-                block_text = ' | '.join(texts)
-
-                table_regions.append({
-                    'page': page_num,
-                    'bbox': (
-                        block_data['left'],
-                        block_data['top'],
-                        block_data['left'] + block_data['width'],
-                        block_data['top'] + block_data['height']
-                    ),
-                    'ocr_text': block_text,
-                    'confidence': 0.6,  # OCR-based extraction has medium confidence
-                    'extraction_method': 'ocr'
-                })
+            image = render_page_image(doc, page_num, retry_dpi)
+            ocr_data = pytesseract.image_to_data(image, output_type=pytesseract.Output.DICT)
+            table_regions, _ = find_table_blocks(ocr_data, page_num, 72 / retry_dpi)
+            return table_regions
+
+        if mean_conf > min_confidence:
+            return table_regions
+
+        for region in table_regions:
+            # Pad the clip slightly so glyphs on the block edge are not cut
+            clip = pymupdf.Rect(region['bbox']) + (-2, -2, 2, 2)
+            image = render_page_image(doc, page_num, retry_dpi, clip)
+            ocr_data = pytesseract.image_to_data(image, output_type=pytesseract.Output.DICT)
+
+            # Confident tokens in block order, joined like a block's text
+            conf = np.trunc(np.asarray(ocr_data['conf'], dtype=np.float64))
+            kept = np.flatnonzero(conf > 30)
+            kept = kept[np.argsort(np.asarray(ocr_data['block_num'])[kept], kind='stable')]
+            text = ' | '.join([t for t in (ocr_data['text'][i].strip() for i in kept) if t])
+
+            if text:
+                region['ocr_text'] = text
 
     except Exception as e:
         print(f"Error in OCR table detection: {e}", file=sys.stderr)
@@ -205,51 +296,60 @@ def extract_tables_with_ocr(pdf_path: str,
     }
 
     try:
-        # Get page count
-        with pdfplumber.open(pdf_path) as pdf:
+        # Keep the PDF open for the whole run instead of re-parsing it per page
+        with pdfplumber.open(pdf_path) as pdf, pymupdf.open(pdf_path) as doc, \
+                ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
             result['page_count'] = len(pdf.pages)
 
             # Determine which pages to process
             if pages_to_process is None:
                 pages_to_process = list(range(1, len(pdf.pages) + 1))
 
-        # Process each page
-        for page_num in pages_to_process:
-            print(f"Processing page {page_num} with OCR...", file=sys.stderr)
-
-            # Get all text lines for context extraction
-            all_lines = get_page_text_lines(pdf_path, page_num)
-
-            # Detect table regions with OCR
-            table_regions = detect_table_regions_with_ocr(pdf_path, page_num)
-
-            for idx, region in enumerate(table_regions):
-                # Use center of bbox for context extraction
-                center_y = (region['bbox'][1] + region['bbox'][3]) / 2
-
-                # Extract context lines
-                context_above = get_context_lines(all_lines, region['bbox'][1],
-                                                 context_lines_count, 'above')
-                context_below = get_context_lines(all_lines, region['bbox'][3],
-                                                 context_lines_count, 'below')
-
-                # Classify table (simplified)
-                table_name = classify_ocr_table(region['ocr_text'], context_above)
-
-                # Create unique table ID with document ID
-                table_id = f"doc{document_id}_ocr_p{page_num}_t{idx}"
-
-                result['tables'].append({
-                    'page': page_num,
-                    'table_id': table_id,
-                    'table_index_on_page': idx,
-                    'table_name': table_name,
-                    'ocr_text': region['ocr_text'],
-                    'context_above_lines': context_above,
-                    'context_below_lines': context_below,
-                    'confidence': region['confidence'],
-                    'extraction_method': 'ocr'
-                })
+            # Detect table regions with OCR on all pages concurrently. OCR runs in
+            # tesseract subprocesses, so threads scale across cores; rendering is
+            # serialised on the shared document and pdfplumber stays on this thread.
+            ocr_futures = {
+                page_num: executor.submit(detect_table_regions_with_ocr, doc, page_num)
+                for page_num in pages_to_process
+            }
+
+            # Process each page
+            for page_num in pages_to_process:
+                print(f"Processing page {page_num} with OCR...", file=sys.stderr)
+
+                # Get all text lines for context extraction
+                all_lines = get_page_lines(pdf, page_num)
+
+                # Wait for this page's OCR table regions
+                table_regions = ocr_futures[page_num].result()
+
+                for idx, region in enumerate(table_regions):
+                    # Use center of bbox for context extraction
+                    center_y = (region['bbox'][1] + region['bbox'][3]) / 2
+
+                    # Extract context lines
+                    context_above = get_context_lines(all_lines, region['bbox'][1],
+                                                     context_lines_count, 'above')
+                    context_below = get_context_lines(all_lines, region['bbox'][3],
+                                                     context_lines_count, 'below')
+
+                    # Classify table (simplified)
+                    table_name = classify_ocr_table(region['ocr_text'], context_above)
+
+                    # Create unique table ID with document ID
+                    table_id = f"doc{document_id}_ocr_p{page_num}_t{idx}"
+
+                    result['tables'].append({
+                        'page': page_num,
+                        'table_id': table_id,
+                        'table_index_on_page': idx,
+                        'table_name': table_name,
+                        'ocr_text': region['ocr_text'],
+                        'context_above_lines': context_above,
+                        'context_below_lines': context_below,
+                        'confidence': region['confidence'],
+                        'extraction_method': 'ocr'
+                    })
 
     except Exception as e:
         result['success'] = False
@@ -264,20 +364,7 @@ def classify_ocr_table(text: str, context_above: List[str]) -> str:
     """
     all_text = ' '.join(context_above + [text]).lower()
 
-    patterns = [
-        ('RATIOS', ['ratio', 'coverage', 'debt service', 'icr']),
-        ('NDCF', ['ndcf', 'net distributable cash flow']),
-        ('DISTRIBUTION', ['distribution', 'per unit', 'dpu']),
-        ('P&L', ['profit', 'loss', 'income', 'revenue', 'expenses']),
-        ('BALANCE_SHEET', ['assets', 'liabilities', 'equity', 'balance sheet']),
-        ('FINANCIAL', ['financial', 'statement', 'quarter', 'year']),
-    ]
-
-    for name, keywords in patterns:
-        if any(kw in all_text for kw in keywords):
-            return name
-
-    return 'UNKNOWN'
+    return match_first_label(_OCR_TABLE_RE, _OCR_TABLE_PATTERNS, all_text) or 'UNKNOWN'
 
 
 if __name__ == '__main__':
@@ -302,4 +389,4 @@ if __name__ == '__main__':
     document_id = int(sys.argv[4]) if len(sys.argv) > 4 else 0
 
     result = extract_tables_with_ocr(pdf_path, pages_to_process, context_lines, document_id)
-    print(json.dumps(result, ensure_ascii=False))
+    write_result(result)
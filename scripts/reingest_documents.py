@@ -6,21 +6,17 @@ Clears and re-ingests documents to match the current table schema
 
 import sys
 import os
+import asyncio
+import argparse
 from pathlib import Path
 
+import httpx
+
 # Add parent directory to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-def load_env():
-    """Load environment variables from .env.local"""
-    env_path = Path(__file__).parent.parent / '.env.local'
-    if env_path.exists():
-        with open(env_path) as f:
-            for line in f:
-                line = line.strip()
-                if line and not line.startswith('#') and '=' in line:
-                    key, value = line.split('=', 1)
-                    os.environ[key] = value.strip('"').strip("'")
+from env_local import load_env
+from documents import iter_documents, pdf_exists
 
 load_env()
 
@@ -37,103 +33,136 @@ except Exception as e:
     print(f"Error connecting to Supabase: {e}")
     sys.exit(1)
 
+# Extra attempts when the ingestion API is overloaded (429/503)
+INGEST_RETRIES = 4
+
+# Document columns sent to the ingestion API as metadata
+DOCUMENT_METADATA_COLUMNS = 'file_name,display_name,date,tags,category'
+
 
-def clear_document_data(document_id: int):
+def create_http_client(max_connections: int) -> httpx.AsyncClient:
     """
-    Clear all extracted data for a document (tables, rows, chunks)
+    Create an async HTTP client for the ingestion API
+
+    Connections are kept alive and pooled (one per concurrent document).
+    Failed connection attempts are retried by the transport; a timeout or
+    dropped response is not, because ingestion is not idempotent.
 
     Args:
-        document_id: Document ID to clear
+        max_connections: Maximum number of concurrent connections
     """
-    print(f"\n🗑️  Clearing data for document {document_id}...")
+    limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+    return httpx.AsyncClient(
+        transport=httpx.AsyncHTTPTransport(retries=INGEST_RETRIES, limits=limits),
+        timeout=300  # 5 minute timeout
+    )
 
-    try:
-        # Get table IDs for this document first
-        tables_result = supabase.table('tables').select('table_id').eq('document_id', document_id).execute()
-        table_ids = [t['table_id'] for t in tables_result.data]
-
-        # Delete table rows using table_id
-        if table_ids:
-            for table_id in table_ids:
-                supabase.table('table_rows').delete().eq('table_id', table_id).execute()
-            print(f"   ✓ Deleted table rows from {len(table_ids)} tables")
-        else:
-            print("   ✓ No table rows to delete")
 
-        # Delete tables
-        supabase.table('tables').delete().eq('document_id', document_id).execute()
-        print("   ✓ Deleted tables")
+def clear_document_data(document_id: int, log=print):
+    """
+    Clear all extracted data for a document (tables, rows, chunks)
+
+    Runs the clear_document function from database-setup.sql, which deletes
+    everything in one round-trip and one transaction.
 
-        # Delete text chunks
-        supabase.table('text_chunks').delete().eq('document_id', document_id).execute()
-        print("   ✓ Deleted text chunks")
+    Args:
+        document_id: Document ID to clear
+        log: Function used to report progress
+    """
+    log(f"\n🗑️  Clearing data for document {document_id}...")
 
-        # Delete ingestion logs
-        supabase.table('ingestion_logs').delete().eq('document_id', document_id).execute()
-        print("   ✓ Deleted ingestion logs")
+    try:
+        supabase.rpc('clear_document', {'doc_id': document_id}).execute()
+        log("   ✓ Deleted table rows, tables, text chunks and ingestion logs")
 
-        print("   ✅ Data cleared successfully")
+        log("   ✅ Data cleared successfully")
         return True
 
     except Exception as e:
-        print(f"   ❌ Error clearing data: {e}")
+        log(f"   ❌ Error clearing data (is clear_document from database-setup.sql installed?): {e}")
         return False
 
 
-def reingest_document(document_id: int, pdf_path: str):
+async def reingest_document(document_id: int, pdf_path: str, client: httpx.AsyncClient, log=print):
     """
     Re-ingest a document using the ingestion API
 
+    Retries with exponential backoff while the API answers 429 or 503, i.e.
+    before the ingest could have run.
+
     Args:
         document_id: Document ID
         pdf_path: Path to PDF file
+        client: HTTP client for the ingestion API (see create_http_client)
+        log: Function used to report progress
     """
-    import requests
-
-    print(f"\n📄 Re-ingesting document {document_id}: {pdf_path}")
+    log(f"\n📄 Re-ingesting document {document_id}: {pdf_path}")
 
     # Get document metadata
     try:
-        doc_result = supabase.table('documents').select('*').eq('id', document_id).single().execute()
+        doc_result = await asyncio.to_thread(
+            supabase.table('documents').select(DOCUMENT_METADATA_COLUMNS).eq('id', document_id).single().execute
+        )
         doc = doc_result.data
     except Exception as e:
-        print(f"   ❌ Error fetching document: {e}")
+        log(f"   ❌ Error fetching document: {e}")
         return False
 
     # Call ingestion API
     try:
-        response = requests.post(
-            'http://localhost:3000/api/ingest',
-            json={
-                'filePath': pdf_path,
-                'metadata': {
-                    'fileName': doc['file_name'],
-                    'displayName': doc['display_name'],
-                    'date': doc['date'],
-                    'tags': doc.get('tags', []),
-                    'category': doc.get('category', 'uncategorized')
+        for attempt in range(INGEST_RETRIES + 1):
+            response = await client.post(
+                'http://localhost:3000/api/ingest',
+                json={
+                    'filePath': pdf_path,
+                    'metadata': {
+                        'fileName': doc['file_name'],
+                        'displayName': doc['display_name'],
+                        'date': doc['date'],
+                        'tags': doc.get('tags', []),
+                        'category': doc.get('category', 'uncategorized')
+                    }
                 }
-            },
-            timeout=300  # 5 minute timeout
-        )
+            )
+
+            if response.status_code not in (429, 503) or attempt == INGEST_RETRIES:
+                break
+
+            retry_after = response.headers.get('Retry-After', '')
+            delay = int(retry_after) if retry_after.isdigit() else 2 ** attempt
+            log(f"   ⏳ Ingestion API busy ({response.status_code}), retrying in {delay}s...")
+            await asyncio.sleep(delay)
 
         if response.status_code == 200:
             result = response.json()
-            print(f"   ✅ Ingestion successful!")
-            print(f"   📊 Chunks extracted: {result.get('chunksExtracted', 'N/A')}")
-            print(f"   📋 Tables extracted: {result.get('tablesExtracted', 'N/A')}")
+            log(f"   ✅ Ingestion successful!")
+            log(f"   📊 Chunks extracted: {result.get('chunksExtracted', 'N/A')}")
+            log(f"   📋 Tables extracted: {result.get('tablesExtracted', 'N/A')}")
             return True
         else:
-            print(f"   ❌ Ingestion failed: {response.status_code}")
-            print(f"   Error: {response.text}")
+            log(f"   ❌ Ingestion failed: {response.status_code}")
+            log(f"   Error: {response.text}")
             return False
 
     except Exception as e:
-        print(f"   ❌ Error calling ingestion API: {e}")
+        log(f"   ❌ Error calling ingestion API: {e}")
         return False
 
 
-def main():
+def parse_args() -> argparse.Namespace:
+    """Parse command-line options"""
+    parser = argparse.ArgumentParser(description="Clear and re-ingest documents")
+    parser.add_argument('--yes', '-y', action='store_true',
+                        help="Skip the confirmation prompt")
+    parser.add_argument('--workers', type=int,
+                        default=int(os.getenv('REINGEST_MAX_WORKERS', '8')),
+                        help="Documents to re-ingest in parallel (default: $REINGEST_MAX_WORKERS or 8)")
+    parser.add_argument('--doc-id', type=int, action='append', dest='doc_ids',
+                        help="Only re-ingest this document ID (repeatable)")
+    return parser.parse_args()
+
+
+async def main(args: argparse.Namespace):
     """Main re-ingestion function"""
 
     print("="*70)
@@ -144,8 +173,7 @@ def main():
 
     # Get all documents
     try:
-        result = supabase.table('documents').select('*').execute()
-        documents = result.data
+        documents = list(iter_documents(supabase, 'id,file_path,display_name'))
     except Exception as e:
         print(f"Error fetching documents: {e}")
         return
@@ -156,40 +184,68 @@ def main():
 
     print(f"Found {len(documents)} document(s) in database\n")
 
+    # Restrict to the requested documents, e.g. to retry failures from a previous run
+    if args.doc_ids:
+        wanted = set(args.doc_ids)
+        documents = [doc for doc in documents if doc['id'] in wanted]
+
+        missing = wanted - {doc['id'] for doc in documents}
+        if missing:
+            print(f"⚠️  Document ID(s) not found: {', '.join(map(str, sorted(missing)))}")
+        if not documents:
+            return
+
+        print(f"Selected {len(documents)} document(s)\n")
+
     # Ask for confirmation
-    response = input("Do you want to proceed with re-ingestion? (yes/no): ")
-    if response.lower() not in ['yes', 'y']:
-        print("Re-ingestion cancelled")
-        return
+    if not args.yes:
+        response = input("Do you want to proceed with re-ingestion? (yes/no): ")
+        if response.lower() not in ['yes', 'y']:
+            print("Re-ingestion cancelled")
+            return
 
-    success_count = 0
-    fail_count = 0
+    max_workers = max(1, args.workers)
+    print(f"Re-ingesting with up to {max_workers} document(s) in parallel\n")
 
-    for doc in documents:
+    async def process_doc(doc):
+        """Clear and re-ingest one document, printing its log as one block"""
         doc_id = doc['id']
         file_path = doc.get('file_path', '')
+        lines = []
+        log = lines.append
 
-        # Check if file exists
-        if not file_path or not os.path.exists(file_path):
-            print(f"\n⚠️  Skipping document {doc_id}: File not found at {file_path}")
-            fail_count += 1
-            continue
-
-        print(f"\n{'='*70}")
-        print(f"Processing Document {doc_id}: {doc['display_name']}")
-        print(f"{'='*70}")
-
-        # Clear existing data
-        if not clear_document_data(doc_id):
-            print(f"❌ Failed to clear data for document {doc_id}")
-            fail_count += 1
-            continue
-
-        # Re-ingest
-        if reingest_document(doc_id, file_path):
-            success_count += 1
-        else:
-            fail_count += 1
+        try:
+            # Check if file exists
+            if not file_path or not pdf_exists(file_path):
+                log(f"\n⚠️  Skipping document {doc_id}: File not found at {file_path}")
+                return False
+
+            async with semaphore:
+                log(f"\n{'='*70}")
+                log(f"Processing Document {doc_id}: {doc['display_name']}")
+                log(f"{'='*70}")
+
+                # Clear existing data
+                if not await asyncio.to_thread(clear_document_data, doc_id, log):
+                    log(f"❌ Failed to clear data for document {doc_id}")
+                    return False
+
+                # Re-ingest
+                return await reingest_document(doc_id, file_path, client, log)
+
+        finally:
+            print('\n'.join(lines), flush=True)
+
+    # Ingestion is I/O-bound (HTTP + Supabase), so documents run concurrently
+    # on one event loop; REINGEST_MAX_WORKERS tunes this to what the ingestion
+    # server can handle
+    semaphore = asyncio.Semaphore(max_workers)
+
+    async with create_http_client(max_workers) as client:
+        results = await asyncio.gather(*(process_doc(doc) for doc in documents))
+
+    success_count = sum(results)
+    fail_count = len(results) - success_count
 
     # Summary
     print(f"\n{'='*70}")
@@ -205,4 +261,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main(parse_args()))
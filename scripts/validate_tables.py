@@ -7,6 +7,12 @@ Compares extracted tables from database with source PDFs to measure accuracy
 import sys
 import os
 import json
+import argparse
+import hashlib
+import textwrap
+import asyncio
+import threading
+import multiprocessing
 import camelot
 import pdfplumber
 from typing import List, Dict, Any, Tuple
@@ -15,16 +21,8 @@ from pathlib import Path
 # Add parent directory to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-def load_env():
-    """Load environment variables from .env.local"""
-    env_path = Path(__file__).parent.parent / '.env.local'
-    if env_path.exists():
-        with open(env_path) as f:
-            for line in f:
-                line = line.strip()
-                if line and not line.startswith('#') and '=' in line:
-                    key, value = line.split('=', 1)
-                    os.environ[key] = value.strip('"').strip("'")
+from env_local import load_env
+from documents import iter_documents, pdf_exists
 
 load_env()
 
@@ -41,39 +39,165 @@ except Exception as e:
     print(f"Error connecting to Supabase: {e}")
     sys.exit(1)
 
+# Table IDs per row count query, keeping each response under the API's row limit
+FETCH_BATCH_SIZE = 500
 
-def extract_pdf_tables(pdf_path: str, page: int = None) -> List[Dict[str, Any]]:
+# Each Camelot run already spreads its pages over every core, so documents
+# validated concurrently take turns rather than oversubscribing the CPU
+_camelot_lock = threading.Lock()
+
+# Worker processes for Camelot, spawned on first use and shared by every
+# document for the rest of the run (see _get_camelot_pool)
+_camelot_pool = None
+
+# Table columns read during validation
+TABLE_COLUMNS = 'table_id,table_name,page,confidence,context_above_lines,context_below_lines'
+
+# Ways of extracting the reference tables from a PDF. Camelot is what
+# ingestion uses, so only its tables measure ingestion errors; pdfplumber
+# is a faster opt-in whose tables often differ from Camelot's.
+EXTRACTION_METHODS = ('camelot', 'pdfplumber')
+
+# Extracted PDF tables, keyed by the SHA-256 of the PDF contents
+CACHE_DIR = Path(__file__).parent.parent / 'cache'
+
+# Part of every cache file name; bump it whenever extraction changes
+# (flavors, Camelot options, table fields) so stale results are not reused
+EXTRACTOR_VERSION = 'v1'
+
+
+def extract_pdf_tables_pdfplumber(pdf_path: str, page: int = None) -> List[Dict[str, Any]]:
+    """
+    Extract tables from PDF with pdfplumber (no Ghostscript, but not what ingestion uses)
+
+    Args:
+        pdf_path: Path to PDF file
+        page: Specific page to extract (None for all pages)
+
+    Returns:
+        List of table dictionaries in the same shape as extract_pdf_tables
+    """
+    tables = []
+
+    with pdfplumber.open(pdf_path) as pdf:
+        pages = [pdf.pages[page - 1]] if page else pdf.pages
+
+        for pdf_page in pages:
+            for table in pdf_page.extract_tables():
+                data = [[cell or '' for cell in row] for row in table]
+                tables.append({
+                    'page': pdf_page.page_number,
+                    'index': len(tables) + 1,
+                    'data': data,
+                    'shape': (len(data), max(map(len, data), default=0)),
+                    'accuracy': None,
+                    'whitespace': None,
+                    'method': 'pdfplumber'
+                })
+
+            pdf_page.close()
+
+    return tables
+
+
+def _camelot_one_page(pdf_path: str, page: int, flavor: str) -> List[Dict[str, Any]]:
+    """
+    Extract one page's tables with Camelot (runs in a worker process)
+
+    Returns:
+        Picklable table dictionaries, without the document-wide 'index'
+    """
+    return [
+        {
+            'page': table.page,
+            'data': table.df.values.tolist(),
+            'shape': table.df.shape,
+            'accuracy': table.parsing_report.get('accuracy', 0.0),
+            'whitespace': table.parsing_report.get('whitespace', 0.0),
+            'method': flavor
+        }
+        for table in camelot.read_pdf(pdf_path, pages=str(page), flavor=flavor)
+    ]
+
+
+def _get_camelot_pool():
+    """
+    Return the shared Camelot process pool, creating it on first use
+
+    Workers are spawned rather than forked: extraction runs in a worker
+    thread while other threads hold locks (HTTP, pdfplumber) that a forked
+    child would inherit. Spawning re-imports this script in every worker,
+    so the pool is created once per run. Call with _camelot_lock held.
     """
-    Extract tables from PDF using same method as ingestion
+    global _camelot_pool
+
+    if _camelot_pool is None:
+        _camelot_pool = multiprocessing.get_context('spawn').Pool(os.cpu_count() or 1)
+
+    return _camelot_pool
+
+
+def close_camelot_pool():
+    """Shut down the shared Camelot process pool, if it was started"""
+    global _camelot_pool
+
+    with _camelot_lock:
+        if _camelot_pool is not None:
+            _camelot_pool.close()
+            _camelot_pool.join()
+            _camelot_pool = None
+
+
+def extract_pdf_tables_uncached(pdf_path: str, page: int = None,
+                                method: str = 'camelot') -> List[Dict[str, Any]]:
+    """
+    Extract tables from PDF with Camelot (lattice, then stream, as in ingestion)
+
+    With method='pdfplumber' only pdfplumber is used, and its tables carry
+    'pdfplumber' as their method.
 
     Args:
         pdf_path: Path to PDF file
         page: Specific page to extract (None for all pages)
+        method: One of EXTRACTION_METHODS
 
     Returns:
         List of table dictionaries with data and metadata
     """
+    if method == 'pdfplumber':
+        try:
+            return extract_pdf_tables_pdfplumber(pdf_path, page)
+
+        except Exception as e:
+            print(f"Error extracting tables with pdfplumber: {e}", file=sys.stderr)
+            return []
+
     tables = []
 
     try:
-        # Try lattice method first (bordered tables)
-        page_str = str(page) if page else 'all'
-        camelot_tables = camelot.read_pdf(pdf_path, pages=page_str, flavor='lattice')
-
-        # Fallback to stream method if no tables found
-        if len(camelot_tables) == 0:
-            camelot_tables = camelot.read_pdf(pdf_path, pages=page_str, flavor='stream')
-
-        for idx, table in enumerate(camelot_tables):
-            tables.append({
-                'page': table.page,
-                'index': idx + 1,
-                'data': table.df.values.tolist(),
-                'shape': table.df.shape,
-                'accuracy': table.parsing_report.get('accuracy', 0.0),
-                'whitespace': table.parsing_report.get('whitespace', 0.0),
-                'method': 'lattice' if camelot_tables._tables[idx].flavor == 'lattice' else 'stream'
-            })
+        if page:
+            pages = [page]
+        else:
+            with pdfplumber.open(pdf_path) as pdf:
+                pages = range(1, len(pdf.pages) + 1)
+
+        # Camelot works page by page in pure Python, so shard the pages over
+        # the shared process pool; a single page runs in this process. Try
+        # lattice method first (bordered tables), and fall back to stream
+        # method if no tables found.
+        with _camelot_lock:
+            for flavor in ('lattice', 'stream'):
+                page_args = [(pdf_path, p, flavor) for p in pages]
+                if len(page_args) == 1:
+                    page_tables = [_camelot_one_page(*page_args[0])]
+                else:
+                    page_tables = _get_camelot_pool().starmap(_camelot_one_page, page_args)
+                tables = [table for page_result in page_tables for table in page_result]
+                if tables:
+                    break
+
+        for idx, table in enumerate(tables):
+            table['index'] = idx + 1
 
     except Exception as e:
         print(f"Error extracting tables from PDF: {e}", file=sys.stderr)
@@ -81,6 +205,60 @@ def extract_pdf_tables(pdf_path: str, page: int = None) -> List[Dict[str, Any]]:
     return tables
 
 
+def _pdf_cache_key(pdf_path: str) -> str:
+    """SHA-256 hex digest of a PDF's contents"""
+    with open(pdf_path, 'rb') as f:
+        return hashlib.file_digest(f, 'sha256').hexdigest()
+
+
+def extract_pdf_tables(pdf_path: str, page: int = None, method: str = 'camelot') -> List[Dict[str, Any]]:
+    """
+    Extract tables from PDF, reusing the cached result for unchanged files
+
+    Results are stored in cache/<sha256>_<method>_<version>.json
+    (cache/<sha256>_<method>_<version>_p<page>.json for a single page), so
+    re-validating an unchanged PDF with the same extractor skips extraction.
+    Empty results are not cached, since they may come from a failed run.
+
+    Args:
+        pdf_path: Path to PDF file
+        page: Specific page to extract (None for all pages)
+        method: One of EXTRACTION_METHODS
+
+    Returns:
+        List of table dictionaries with data and metadata
+    """
+    cache_path = None
+
+    try:
+        suffix = f"_p{page}" if page else ''
+        cache_path = CACHE_DIR / f"{_pdf_cache_key(pdf_path)}_{method}_{EXTRACTOR_VERSION}{suffix}.json"
+
+        if cache_path.exists():
+            tables = json.loads(cache_path.read_text())
+            for table in tables:
+                table['shape'] = tuple(table['shape'])
+            return tables
+
+    except Exception as e:
+        print(f"Error reading extraction cache: {e}", file=sys.stderr)
+
+    tables = extract_pdf_tables_uncached(pdf_path, page, method)
+
+    if tables and cache_path is not None:
+        try:
+            # Write then rename, so concurrent readers never see a partial file
+            CACHE_DIR.mkdir(exist_ok=True)
+            tmp_path = cache_path.with_suffix(f'.{os.getpid()}.{threading.get_ident()}.tmp')
+            tmp_path.write_text(json.dumps(tables, default=str))
+            os.replace(tmp_path, cache_path)
+
+        except Exception as e:
+            print(f"Error writing extraction cache: {e}", file=sys.stderr)
+
+    return tables
+
+
 def get_db_tables(document_id: int = None) -> List[Dict[str, Any]]:
     """
     Fetch tables from database
@@ -92,7 +270,7 @@ def get_db_tables(document_id: int = None) -> List[Dict[str, Any]]:
         List of table records from database
     """
     try:
-        query = supabase.table('tables').select('*')
+        query = supabase.table('tables').select(TABLE_COLUMNS)
 
         if document_id:
             query = query.eq('document_id', document_id)
@@ -105,26 +283,40 @@ def get_db_tables(document_id: int = None) -> List[Dict[str, Any]]:
         return []
 
 
-def get_db_table_rows(table_id: str) -> List[Dict[str, Any]]:
+def get_db_table_row_counts(table_ids: List[str]) -> Dict[str, int]:
     """
-    Fetch table rows from database for a specific table
+    Count table rows in the database for several tables at once
+
+    Uses the table_row_counts function from database-setup.sql, so only one
+    (table_id, count) pair per table is transferred instead of the rows.
 
     Args:
-        table_id: Table ID to fetch rows for
+        table_ids: Table IDs to count rows for
 
     Returns:
-        List of table row records
+        Row count by table ID (tables without rows are absent)
+
+    Raises:
+        RuntimeError: If the counts cannot be fetched, e.g. because the
+            function is missing on a database set up before it was added
     """
+    row_counts = {}
+
     try:
-        result = supabase.table('table_rows').select('*').eq('table_id', table_id).execute()
-        return result.data
+        for i in range(0, len(table_ids), FETCH_BATCH_SIZE):
+            batch = table_ids[i:i + FETCH_BATCH_SIZE]
+            result = supabase.rpc('table_row_counts', {'table_ids': batch}).execute()
+            row_counts.update((r['table_id'], r['row_count']) for r in result.data)
 
     except Exception as e:
-        print(f"Error fetching table rows: {e}")
-        return []
+        raise RuntimeError(
+            f"Error counting table rows (is table_row_counts from database-setup.sql installed?): {e}"
+        ) from e
+
+    return row_counts
 
 
-def compare_table_structure(pdf_table: Dict, db_table: Dict, db_rows: List[Dict]) -> Dict[str, Any]:
+def compare_table_structure(pdf_table: Dict, db_table: Dict, db_row_count: int) -> Dict[str, Any]:
     """
     Compare extracted PDF table with database table
 
@@ -132,7 +324,6 @@ def compare_table_structure(pdf_table: Dict, db_table: Dict, db_rows: List[Dict]
         Dictionary with comparison metrics
     """
     pdf_rows, pdf_cols = pdf_table['shape']
-    db_row_count = len(db_rows)
 
     # Calculate structural accuracy
     row_match = db_row_count == pdf_rows
@@ -147,48 +338,104 @@ def compare_table_structure(pdf_table: Dict, db_table: Dict, db_rows: List[Dict]
     }
 
 
-def validate_document_tables(document_id: int, pdf_path: str) -> Dict[str, Any]:
+def validate_document_tables(document_id: int, pdf_path: str, log=print,
+                             skip_pdf: bool = False, method: str = 'camelot') -> Dict[str, Any]:
     """
     Validate all tables for a document
 
+    The database is read first, so documents without tables never have
+    their PDF opened.
+
     Args:
         document_id: Database document ID
         pdf_path: Path to source PDF
+        log: Function used to report progress
+        skip_pdf: Only check database invariants (every table has rows),
+            without extracting tables from the PDF
+        method: How PDF tables are extracted (one of EXTRACTION_METHODS)
 
     Returns:
         Validation report dictionary
     """
-    print(f"\n{'='*70}")
-    print(f"VALIDATING DOCUMENT {document_id}: {pdf_path}")
-    print(f"{'='*70}\n")
-
-    # Extract tables from PDF
-    pdf_tables = extract_pdf_tables(pdf_path)
-    print(f"📄 Found {len(pdf_tables)} tables in PDF")
+    log(f"\n{'='*70}")
+    log(f"VALIDATING DOCUMENT {document_id}: {pdf_path}")
+    log(f"{'='*70}\n")
 
     # Get tables from database
     db_tables = get_db_tables(document_id)
-    print(f"💾 Found {len(db_tables)} tables in database")
+    log(f"💾 Found {len(db_tables)} tables in database")
+
+    if not db_tables:
+        log("ℹ️  No tables in database, skipping PDF extraction")
+        return {
+            'document_id': document_id,
+            'pdf_path': pdf_path,
+            'total_tables': 0,
+            'matched': 0,
+            'accuracy': 0,
+            'avg_confidence': 0,
+            'results': []
+        }
 
-    if len(pdf_tables) != len(db_tables):
-        print(f"⚠️  WARNING: Table count mismatch!")
+    # Extract tables from PDF
+    if skip_pdf:
+        pdf_tables = []
+    else:
+        pdf_tables = extract_pdf_tables(pdf_path, method=method)
+        log(f"📄 Found {len(pdf_tables)} tables in PDF ({method})")
+
+        if len(pdf_tables) != len(db_tables):
+            log(f"⚠️  WARNING: Table count mismatch!")
+
+    # Count rows for every table in one round-trip rather than one per table.
+    # Without counts every table would look empty, so stop instead of
+    # reporting them all as mismatches.
+    try:
+        db_row_counts = get_db_table_row_counts([t['table_id'] for t in db_tables])
+    except RuntimeError as e:
+        log(f"❌ {e}")
+        return {
+            'document_id': document_id,
+            'pdf_path': pdf_path,
+            'total_tables': 0,
+            'matched': 0,
+            'accuracy': 0,
+            'avg_confidence': 0,
+            'results': [],
+            'error': str(e)
+        }
+
+    # Index PDF tables by (page, index) so each lookup is O(1)
+    pdf_tables_by_key = {(t['page'], t['index']): t for t in pdf_tables}
 
     # Compare each table
     results = []
 
     for idx, db_table in enumerate(db_tables):
-        print(f"\n--- Table {idx + 1}: {db_table['table_name']} (Page {db_table['page']}) ---")
-        print(f"Table ID: {db_table['table_id']}")
-        print(f"Confidence: {db_table.get('confidence', 'N/A')}")
+        log(f"\n--- Table {idx + 1}: {db_table['table_name']} (Page {db_table['page']}) ---")
+        log(f"Table ID: {db_table['table_id']}")
+        log(f"Confidence: {db_table.get('confidence', 'N/A')}")
+
+        if skip_pdf:
+            db_row_count = db_row_counts.get(db_table['table_id'], 0)
+            log(f"DB Rows: {db_row_count}")
+            log("✅ Table has rows" if db_row_count else "⚠️  Table has no rows")
+
+            results.append({
+                'table_id': db_table['table_id'],
+                'table_name': db_table['table_name'],
+                'page': db_table['page'],
+                'status': 'match' if db_row_count else 'mismatch',
+                'confidence': db_table.get('confidence'),
+                'db_row_count': db_row_count
+            })
+            continue
 
         # Find matching PDF table by page
-        pdf_table = next(
-            (t for t in pdf_tables if t['page'] == db_table['page'] and t['index'] == db_table.get('table_index_on_page', idx + 1)),
-            None
-        )
+        pdf_table = pdf_tables_by_key.get((db_table['page'], db_table.get('table_index_on_page', idx + 1)))
 
         if not pdf_table:
-            print("❌ No matching PDF table found")
+            log("❌ No matching PDF table found")
             results.append({
                 'table_id': db_table['table_id'],
                 'status': 'no_match',
@@ -196,32 +443,30 @@ def validate_document_tables(document_id: int, pdf_path: str) -> Dict[str, Any]:
             })
             continue
 
-        # Get table rows
-        db_rows = get_db_table_rows(db_table['table_id'])
-
         # Compare
-        comparison = compare_table_structure(pdf_table, db_table, db_rows)
+        comparison = compare_table_structure(pdf_table, db_table, db_row_counts.get(db_table['table_id'], 0))
 
-        print(f"PDF Shape: {comparison['pdf_shape']} (rows × cols)")
-        print(f"DB Rows: {comparison['db_row_count']}")
-        print(f"Extraction Method: {comparison['method']}")
-        print(f"Camelot Accuracy: {comparison['extraction_accuracy']:.1f}%")
+        log(f"PDF Shape: {comparison['pdf_shape']} (rows × cols)")
+        log(f"DB Rows: {comparison['db_row_count']}")
+        log(f"Extraction Method: {comparison['method']}")
+        if comparison['extraction_accuracy'] is not None:
+            log(f"Camelot Accuracy: {comparison['extraction_accuracy']:.1f}%")
 
         if comparison['row_match']:
-            print("✅ Row count matches")
+            log("✅ Row count matches")
         else:
-            print(f"⚠️  Row count mismatch: PDF has {comparison['pdf_shape'][0]}, DB has {comparison['db_row_count']}")
+            log(f"⚠️  Row count mismatch: PDF has {comparison['pdf_shape'][0]}, DB has {comparison['db_row_count']}")
 
         # Context lines
         context_above = db_table.get('context_above_lines', [])
         context_below = db_table.get('context_below_lines', [])
 
         if context_above:
-            print(f"📝 Context above: {len(context_above)} lines")
-            print(f"   → {context_above[0][:60]}..." if context_above else "")
+            log(f"📝 Context above: {len(context_above)} lines")
+            log(f"   → {context_above[0][:60]}..." if context_above else "")
 
         if context_below:
-            print(f"📝 Context below: {len(context_below)} lines")
+            log(f"📝 Context below: {len(context_below)} lines")
 
         results.append({
             'table_id': db_table['table_id'],
@@ -233,21 +478,21 @@ def validate_document_tables(document_id: int, pdf_path: str) -> Dict[str, Any]:
         })
 
     # Summary
-    print(f"\n{'='*70}")
-    print("VALIDATION SUMMARY")
-    print(f"{'='*70}")
+    log(f"\n{'='*70}")
+    log("VALIDATION SUMMARY")
+    log(f"{'='*70}")
 
     total = len(results)
     matched = sum(1 for r in results if r['status'] == 'match')
     accuracy = (matched / total * 100) if total > 0 else 0
 
-    print(f"Total Tables: {total}")
-    print(f"Matched: {matched}")
-    print(f"Mismatched: {total - matched}")
-    print(f"Overall Accuracy: {accuracy:.1f}%")
+    log(f"Total Tables: {total}")
+    log(f"Matched: {matched}")
+    log(f"Mismatched: {total - matched}")
+    log(f"Overall Accuracy: {accuracy:.1f}%")
 
     avg_confidence = sum(r.get('confidence', 0) or 0 for r in results) / total if total > 0 else 0
-    print(f"Average Extraction Confidence: {avg_confidence:.1f}%")
+    log(f"Average Extraction Confidence: {avg_confidence:.1f}%")
 
     return {
         'document_id': document_id,
@@ -260,13 +505,23 @@ def validate_document_tables(document_id: int, pdf_path: str) -> Dict[str, Any]:
     }
 
 
-def main():
+def parse_args() -> argparse.Namespace:
+    """Parse command-line options"""
+    parser = argparse.ArgumentParser(description="Validate extracted tables against source PDFs")
+    parser.add_argument('--skip-pdf', action='store_true',
+                        help="Only check the database (every table has rows); do not open the PDFs")
+    parser.add_argument('--method', choices=EXTRACTION_METHODS, default='camelot',
+                        help="How tables are extracted from the PDFs (default: camelot, as in ingestion; "
+                             "pdfplumber is faster but finds different tables)")
+    return parser.parse_args()
+
+
+async def main(args: argparse.Namespace):
     """Main validation function"""
 
     # Get all documents
     try:
-        result = supabase.table('documents').select('*').execute()
-        documents = result.data
+        documents = list(iter_documents(supabase, 'id,file_path'))
     except Exception as e:
         print(f"Error fetching documents: {e}")
         return
@@ -277,45 +532,90 @@ def main():
 
     print(f"\nFound {len(documents)} document(s) in database\n")
 
-    all_results = []
+    # Validate documents concurrently in worker threads, so one document's
+    # Supabase queries overlap another's PDF extraction
+    semaphore = asyncio.Semaphore(os.cpu_count() or 1)
+
+    # The detailed report is a JSON array written one document at a time as
+    # validations finish; the file is only created once there is a result
+    report_path = Path(__file__).parent.parent / 'table_validation_report.json'
+    report = None
+
+    def write_report(validation: Dict[str, Any]):
+        nonlocal report
+        if report is None:
+            report = open(report_path, 'w')
+            report.write('[\n')
+        else:
+            report.write(',\n')
+        report.write(textwrap.indent(json.dumps(validation, indent=2, default=str), '  '))
+        report.flush()
+
+    # Running totals for the overall summary, so results need not be kept
+    totals = {'docs': 0, 'failed': 0, 'tables': 0, 'matched': 0, 'confidence_sum': 0.0}
+
+    async def validate(doc_id: int, file_path: str):
+        lines = []
+        async with semaphore:
+            validation = await asyncio.to_thread(validate_document_tables, doc_id, file_path,
+                                                 lines.append, args.skip_pdf, args.method)
+
+        # Print each document's report as one block
+        print('\n'.join(lines))
+        write_report(validation)
+
+        # Documents that could not be validated are counted, not averaged in
+        if 'error' in validation:
+            totals['failed'] += 1
+            return
+
+        totals['docs'] += 1
+        totals['tables'] += validation['total_tables']
+        totals['matched'] += validation['matched']
+        totals['confidence_sum'] += validation['avg_confidence']
+
+    tasks = []
 
     for doc in documents:
         doc_id = doc['id']
         file_path = doc.get('file_path', '')
 
-        # Check if file exists
-        if not file_path or not os.path.exists(file_path):
+        # Check if file exists (not needed when the PDFs are skipped)
+        if not args.skip_pdf and (not file_path or not pdf_exists(file_path)):
             print(f"⚠️  Skipping document {doc_id}: File not found at {file_path}")
             continue
 
         # Validate this document
-        validation = validate_document_tables(doc_id, file_path)
-        all_results.append(validation)
+        tasks.append(validate(doc_id, file_path))
+
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        close_camelot_pool()
+        if report is not None:
+            report.write('\n]\n')
+            report.close()
+
+    if totals['failed']:
+        print(f"\n❌ {totals['failed']} document(s) could not be validated; see the errors above")
 
     # Overall summary
-    if all_results:
+    if totals['docs']:
         print(f"\n{'='*70}")
         print("OVERALL VALIDATION SUMMARY")
         print(f"{'='*70}")
 
-        total_tables = sum(r['total_tables'] for r in all_results)
-        total_matched = sum(r['matched'] for r in all_results)
-        overall_accuracy = (total_matched / total_tables * 100) if total_tables > 0 else 0
-        overall_confidence = sum(r['avg_confidence'] for r in all_results) / len(all_results)
+        overall_accuracy = (totals['matched'] / totals['tables'] * 100) if totals['tables'] > 0 else 0
+        overall_confidence = totals['confidence_sum'] / totals['docs']
 
-        print(f"Documents Validated: {len(all_results)}")
-        print(f"Total Tables: {total_tables}")
-        print(f"Total Matched: {total_matched}")
+        print(f"Documents Validated: {totals['docs']}")
+        print(f"Total Tables: {totals['tables']}")
+        print(f"Total Matched: {totals['matched']}")
         print(f"Overall Accuracy: {overall_accuracy:.1f}%")
         print(f"Average Confidence: {overall_confidence:.1f}%")
 
-        # Save report
-        report_path = Path(__file__).parent.parent / 'table_validation_report.json'
-        with open(report_path, 'w') as f:
-            json.dump(all_results, f, indent=2, default=str)
-
         print(f"\n📊 Detailed report saved to: {report_path}")
 
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main(parse_args()))